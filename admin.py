@@ -1,4 +1,4 @@
-import requests, sys
+import requests, sys, time
 
 
 def listar_colas():
@@ -37,20 +37,96 @@ def borrar_cola(nombre_cola):
         else:
             print(f"\nNo se pudo contactar al broker: {e}\n")
 
+def vista_en_vivo(intervalo=2):
+    """
+    Muestra las estadísticas de todas las colas del clúster, refrescando cada
+    'intervalo' segundos hasta pulsar CTRL+C.
+    """
+    try:
+        while True:
+            r = requests.get(f"{BROKER_URL}/stats", timeout=5)
+            r.raise_for_status()
+            colas = sorted(r.json()["colas"], key=lambda c: c["profundidad"], reverse=True)
+
+            print("\033[2J\033[H", end="") # Limpiamos la pantalla.
+            print(f"Broker {BROKER_URL} - {time.strftime('%H:%M:%S')} - {len(colas)} colas\n")
+            print(f"{'COLA':<20} {'MSGS':>7} {'BYTES':>10} {'UNACK':>6} {'CONS':>5} {'APARC':>5} {'PUB/s':>7} {'ACK/s':>7} {'EDAD(s)':>8}")
+            for c in colas:
+                print(
+                    f"{c['cola'][:20]:<20} {c['profundidad']:>7} {c['bytes']:>10} {c['unacked']:>6} "
+                    f"{c['consumidores']:>5} {c['consumidores_aparcados']:>5} {c['tasa_publicacion']:>7} {c['tasa_ack']:>7} {c['antiguedad_mas_antiguo']:>8.1f}"
+                )
+            print("\nPulsa CTRL+C para volver al menú.")
+            time.sleep(intervalo)
+
+    except KeyboardInterrupt:
+        print()
+    except requests.exceptions.RequestException as e:
+        print(f"\nNo se pudo contactar al broker: {e}")
+
+def purgar_cola(nombre_cola):
+    """
+    Solicita vaciar los mensajes pendientes de una cola.
+    """
+    try:
+        r = requests.delete(f"{BROKER_URL}/colas/{nombre_cola}/mensajes")
+        r.raise_for_status()
+
+        data = r.json()
+        print(f"\nCola '{data.get('cola')}' vaciada: {data.get('purgados')} mensajes eliminados.\n")
+
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 404:
+            print(f"\nLa cola '{nombre_cola}' no fue encontrada en el broker.\n")
+        else:
+            print(f"\nNo se pudo contactar al broker: {e}\n")
+
+def ver_mensajes(nombre_cola, tam_pagina=10):
+    """
+    Muestra los mensajes pendientes de una cola por páginas, sin consumirlos.
+    """
+    desde = 0
+    try:
+        while desde is not None:
+            r = requests.get(
+                f"{BROKER_URL}/colas/{nombre_cola}/mensajes",
+                params={"desde": desde, "limite": tam_pagina}
+            )
+            r.raise_for_status()
+            data = r.json()
+
+            print(f"\nMensajes {data['desde']}-{data['desde'] + len(data['mensajes'])} de {data['profundidad']}:")
+            for mens in data["mensajes"]:
+                tipo = "binario" if mens.get("binario") else "json"
+                print(f"  - {mens['id']} [{tipo}, durable={mens['is_durable']}] {str(mens['payload'])[:60]}")
+
+            desde = data["siguiente"]
+            if desde is not None and input("\nIntro para la siguiente página, 'q' para salir: ").strip() == "q":
+                break
+
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 404:
+            print(f"\nLa cola '{nombre_cola}' no fue encontrada en el broker.\n")
+        else:
+            print(f"\nNo se pudo contactar al broker: {e}\n")
+
 if __name__ == "__main__":
 
     print("\nBienvenido al Admin.\n")
 
-    ip = input("Introduce la IP del broker: ").strip()
-    BROKER_URL = "http://" + ip + ":5000"
+    ip = input("Introduce la IP del broker (IP o IP:puerto): ").strip()
+    BROKER_URL = "http://" + (ip if ":" in ip else ip + ":5000")
 
     opcion = "0"
-    while opcion != "5":
+    while opcion != "6":
 
         print("\nOpciones:\n")
         print("     1. Listar colas existentes.")
         print("     2. Borrar cola.")
-        print("     3. Salir.\n")
+        print("     3. Vista en vivo de las colas.")
+        print("     4. Vaciar cola.")
+        print("     5. Ver mensajes de una cola.")
+        print("     6. Salir.\n")
 
         opcion = input("Seleccione una opcion: ").strip()
         
@@ -62,6 +138,17 @@ if __name__ == "__main__":
             borrar_cola(nombre_cola)
 
         elif opcion == '3':
+            vista_en_vivo()
+
+        elif opcion == '4':
+            nombre_cola = input("\nElige el nombre de la cola a vaciar: ")
+            purgar_cola(nombre_cola)
+
+        elif opcion == '5':
+            nombre_cola = input("\nElige el nombre de la cola a inspeccionar: ")
+            ver_mensajes(nombre_cola)
+
+        elif opcion == '6':
             break
 
     print("Administrador finalizado.")
\ No newline at end of file
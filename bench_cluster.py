@@ -0,0 +1,152 @@
+"""
+Arranca clústeres de 1, 2 y 3 brokers en localhost y mide cuántas publicaciones
+por segundo aceptan cuando los mensajes se reparten entre varias colas.
+
+Con mensajes duraderos cada nodo solo reescribe su propio fichero de persistencia
+en cada publicación, así que el rendimiento crece con el número de nodos incluso
+en una sola CPU. Con mensajes no duraderos el límite es la CPU.
+
+Uso: python bench_cluster.py [--mensajes N] [--colas N] [--hilos N] [--no-durable]
+"""
+import argparse, bisect, os, socket, subprocess, sys, tempfile, threading, time, requests
+
+import broker
+
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def puerto_libre():
+    """
+    Pide al sistema un puerto TCP libre en localhost.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def nodo_propietario(urls, nombre_cola):
+    """
+    Nodo del clúster formado por urls al que pertenece la cola, calculado con el
+    mismo anillo que broker.py pero sin tocar su estado global.
+    """
+    if len(urls) < 2:
+        return urls[0]
+    anillo = broker.construir_anillo(urls)
+    idx = bisect.bisect(anillo, (broker.hash_clave(nombre_cola), "")) % len(anillo)
+    return anillo[idx][1]
+
+
+def arrancar_broker(puerto, directorio, *argumentos):
+    """
+    Lanza broker.py en 127.0.0.1:puerto con su propio fichero de persistencia
+    y espera a que responda.
+    """
+    proceso = subprocess.Popen(
+        [
+            sys.executable, os.path.join(DIRECTORIO, "broker.py"),
+            "--host", "127.0.0.1", "--puerto", str(puerto),
+            "--archivo", os.path.join(directorio, f"broker_{puerto}.json"),
+            *argumentos
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.time() + 15
+    while time.time() < limite:
+        try:
+            requests.get(f"{url}/replicacion/estado", timeout=1)
+            return proceso
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError(f"El broker en {url} no arrancó")
+
+
+def arrancar_cluster(num_nodos, directorio):
+    """
+    Arranca num_nodos brokers que forman un clúster. Devuelve (urls, procesos).
+    """
+    urls = [f"http://127.0.0.1:{puerto_libre()}" for _ in range(num_nodos)]
+    nodos = ",".join(urls)
+    procesos = [
+        arrancar_broker(int(url.rsplit(":", 1)[1]), directorio, "--nodos", nodos)
+        for url in urls
+    ]
+    return urls, procesos
+
+
+def parar(procesos):
+    """
+    Termina los procesos de broker.
+    """
+    for proceso in procesos:
+        proceso.kill()
+    for proceso in procesos:
+        proceso.wait()
+
+
+def medir_publicaciones(urls, num_mensajes, num_colas, num_hilos, durable=True):
+    """
+    Declara num_colas colas y publica num_mensajes repartidos entre ellas desde
+    num_hilos hilos, enviando cada mensaje al nodo propietario de su cola.
+    Devuelve las publicaciones por segundo.
+    """
+    colas = [f"bench-{i}" for i in range(num_colas)]
+    propietario = {cola: nodo_propietario(urls, cola) for cola in colas}
+
+    for cola in colas:
+        requests.post(f"{urls[0]}/declarar_cola", json={"nombre": cola, "durable": durable}).raise_for_status()
+
+    errores = []
+    def publicar(indice_hilo):
+        sesion = requests.Session()
+        for i in range(indice_hilo, num_mensajes, num_hilos):
+            cola = colas[i % num_colas]
+            r = sesion.post(
+                f"{propietario[cola]}/publicar",
+                json={"nombre": cola, "mensaje": f"m{i}", "durable": durable}
+            )
+            if r.status_code != 200:
+                errores.append(r.status_code)
+
+    hilos = [threading.Thread(target=publicar, args=(i,)) for i in range(num_hilos)]
+    inicio = time.time()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.time() - inicio
+
+    if errores:
+        raise RuntimeError(f"{len(errores)} publicaciones fallidas: {errores[:5]}")
+    return num_mensajes / duracion
+
+
+def medir(num_nodos, num_mensajes, num_colas, num_hilos, durable=True):
+    """
+    Arranca un clúster de num_nodos, mide su rendimiento y lo para.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        urls, procesos = arrancar_cluster(num_nodos, directorio)
+        try:
+            return medir_publicaciones(urls, num_mensajes, num_colas, num_hilos, durable)
+        finally:
+            parar(procesos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rendimiento de publicación según el número de nodos.")
+    parser.add_argument("--mensajes", type=int, default=2000)
+    parser.add_argument("--colas", type=int, default=30)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--no-durable", action="store_true", help="Publica mensajes no duraderos.")
+    args = parser.parse_args()
+
+    print(f"{args.mensajes} mensajes en {args.colas} colas desde {args.hilos} hilos (durable: {not args.no_durable}).\n")
+    base = None
+    for num_nodos in (1, 2, 3):
+        tasa = medir(num_nodos, args.mensajes, args.colas, args.hilos, not args.no_durable)
+        base = base or tasa
+        print(f"  {num_nodos} nodo(s): {tasa:8.1f} publicaciones/s  (x{tasa / base:.2f})")
\ No newline at end of file
@@ -1,4 +1,4 @@
-import threading, time, uuid, json, os, requests, socket, psutil
+import threading, time, uuid, json, os, requests, socket, psutil, base64, hashlib, bisect, argparse, itertools
 
 from datetime import datetime, timedelta
 from collections import deque
@@ -14,6 +14,61 @@ g_colas = {} # Esto es la memoria RAM del broker.
 g_lock = threading.Lock() 
 TIMEOUT_ACK = 10
 PREFETCH_COUNT = 1 # Número máximo de mensajes mandados al consumidos a la vez.
+TIMEOUT_LATIDO = 15 # Segundos sin latidos, ACKs ni entregas correctas antes de expulsar a un consumidor.
+MAX_FALLOS_ENTREGA = 2 # Fallos de entrega seguidos antes de aparcar a un consumidor.
+TIEMPO_APARCADO = 10 # Segundos mínimos de aparcamiento; se duplica cada vez que se vuelve a aparcar.
+MAX_TIEMPO_APARCADO = 300
+MAX_MENSAJES_PAGINA = 100 # Máximo de mensajes devueltos por cada página de inspección.
+
+NODO_URL = None # URL de este nodo dentro del clúster.
+g_anillo = [] # Anillo de hash consistente: lista ordenada de (hash, url_nodo).
+NODOS_VIRTUALES = 100 # Puntos que ocupa cada nodo en el anillo.
+g_sesion = requests.Session() # Reutiliza conexiones al reenviar entre nodos.
+
+g_replicas = [] # URLs del grupo de réplica por orden de prioridad (el primero es el líder preferido).
+g_rol = "lider" # "lider" o "seguidor".
+g_lider_url = None # Líder al que sigue este nodo cuando es seguidor.
+QUORUM_ACK = 0 # Seguidores que deben confirmar un cambio duradero antes de responder al productor.
+TIMEOUT_QUORUM = 5
+TIMEOUT_LIDER = 5 # Segundos sin noticias del líder antes de intentar promocionar.
+INTERVALO_LATIDO_LIDER = 1 # Sin eventos, el líder manda un lote vacío cada este tiempo.
+LOTE_REPLICACION = 500 # Máximo de eventos por envío a un seguidor.
+MAX_LOG_REPLICACION = 100000 # Más allá de esto, los seguidores retrasados reciben una instantánea.
+MAX_ESPERA_REPLICACION = 30 # Tope de la espera exponencial entre reintentos a un seguidor caído.
+g_epoca = 0 # Mandato del líder actual; cada promoción lo incrementa.
+g_seq = 0 # Número de secuencia del último evento (líder) o del último aplicado (seguidor).
+g_log_replicacion = deque() # Eventos aún no confirmados por todos; el último tiene número g_seq.
+g_confirmado = {} # url_seguidor -> última secuencia confirmada (None = necesita instantánea).
+g_ultimo_contacto_lider = time.time()
+g_cond_replicacion = threading.Condition(g_lock)
+g_despertar = {} # url_seguidor -> Event que corta la espera entre reintentos cuando el seguidor vuelve.
+
+
+def mensaje_a_json(mens):
+    """
+    Copia serializable de un mensaje: timestamp en ISO y, si el payload es
+    binario, codificado en base64.
+    """
+    serializable_msg = mens.copy()
+    serializable_msg["timestamp"] = mens["timestamp"].isoformat()
+    if mens.get("binario", False):
+        serializable_msg["payload"] = base64.b64encode(mens["payload"]).decode("ascii")
+    return serializable_msg
+
+
+def json_a_mensaje(mens):
+    """
+    Operación inversa a mensaje_a_json.
+    """
+    binario = mens.get("binario", False)
+    return {
+        "id": mens["id"],
+        "payload": base64.b64decode(mens["payload"]) if binario else mens["payload"],
+        "timestamp": datetime.fromisoformat(mens["timestamp"]),
+        "is_durable": mens.get("is_durable", False),
+        "binario": binario,
+        "tamano": mens.get("tamano", 0)
+    }
 
 
 def estado_a_json_serializable(diccionario):
@@ -34,13 +89,14 @@ def estado_a_json_serializable(diccionario):
             if not mens.get("is_durable", False):
                 continue
 
-            serializable_msg = mens.copy()
-            serializable_msg["timestamp"] = mens["timestamp"].isoformat()
-            serializable_mensajes.append(serializable_msg)
+            serializable_mensajes.append(mensaje_a_json(mens))
 
         estado_serializable[name_cola] = {
             "mensajes": serializable_mensajes, 
-            "consumidores": datos_cola["consumidores"], 
+            "consumidores": {
+                url: {"unacked_count": datos["unacked_count"]}
+                for url, datos in datos_cola["consumidores"].items()
+            }, 
             "indice_rr": datos_cola["indice_rr"],
             "durable": datos_cola.get("durable", False),
             "unacked": {} 
@@ -53,11 +109,8 @@ def estado_a_json_serializable(diccionario):
             if not msg_obj.get("is_durable", False):
                 continue
 
-            serializable_msg_obj = msg_obj.copy()
-            serializable_msg_obj["timestamp"] = msg_obj["timestamp"].isoformat()
-            
             estado_serializable[name_cola]["unacked"][mens] = {
-                "mensaje_obj": serializable_msg_obj, 
+                "mensaje_obj": mensaje_a_json(msg_obj), 
                 "timestamp_envio": datos_sinACK["timestamp_envio"].isoformat(),
                 "consumer_url": datos_sinACK["consumer_url"]
             }
@@ -77,48 +130,45 @@ def json_a_estado(json_data):
         # Convertimos los mensajes a objetos con datetime.
         mensajes_con_datetime = deque()
         for mens in datos_cola["mensajes"]:
-            mensajes_con_datetime.append({
-                "id": mens["id"],
-                "payload": mens["payload"],
-                "timestamp": datetime.fromisoformat(mens["timestamp"]),
-                "is_durable": mens.get("is_durable", False)
-            })
+            mensajes_con_datetime.append(json_a_mensaje(mens))
         
         # Convertimos los consumidores y reseteamos los contadores.
         consumidores_con_reset = {}
         for url, data in datos_cola.get("consumidores", {}).items():
-            consumidores_con_reset[url] = {"unacked_count": 0} 
+            consumidores_con_reset[url] = nuevo_consumidor()
 
         estado[name_cola] = {
             "mensajes": mensajes_con_datetime, 
             "consumidores": consumidores_con_reset, # <-- Usar la lista reseteada
             "indice_rr": datos_cola["indice_rr"],
             "durable": datos_cola["durable"],
-            "unacked": {} # Iniciar siempre vacío
+            "unacked": {}, # Iniciar siempre vacío
+            "stats": nuevas_estadisticas()
         }
         
         # Re-encolamos los mensajes sin ACK.
         for mens_id, unacked_data in datos_cola.get("unacked", {}).items():
-            mens = unacked_data["mensaje_obj"]
-            mensaje_obj = {
-                "id": mens["id"],
-                "payload": mens["payload"],
-                "timestamp": datetime.fromisoformat(mens["timestamp"]),
-                "is_durable": mens.get("is_durable", False)
-            }
+            mensaje_obj = json_a_mensaje(unacked_data["mensaje_obj"])
             print(f"Re-encolando {mens_id} de {name_cola} tras reinicio.")
             estado[name_cola]["mensajes"].appendleft(mensaje_obj)
 
+        # Solo al cargar se recorren los mensajes; después el contador es incremental.
+        estado[name_cola]["stats"]["bytes"] = sum(m["tamano"] for m in estado[name_cola]["mensajes"])
+
     return estado
 
 
 def guardar_JSON():
     """
     Guarda el estado de g_colas en el archivo JSON.
+    Con replicación se guarda también la época y la secuencia en la clave
+    "_replicacion" (json_a_estado la ignora porque no es una cola duradera).
     Esta función la tenemos que llamar con el lock adquirido.
     """
     try:
         estado_serializable = estado_a_json_serializable(g_colas)
+        if g_replicas:
+            estado_serializable["_replicacion"] = {"epoca": g_epoca, "seq": g_seq}
         
         archivo_temporal = ARCHIVO_JSON + ".tmp"
         
@@ -134,13 +184,16 @@ def cargar_estado_desde_JSON():
     """
     Carga el estado desde el archivo JSON al arrancar.
     """
-    global g_colas
+    global g_colas, g_epoca, g_seq
     try:
         with open(ARCHIVO_JSON, 'r') as f:
             json_data = json.load(f)
         
         print(f"Cargando estado desde {ARCHIVO_JSON}...")
         g_colas = json_a_estado(json_data)
+        replicacion = json_data.get("_replicacion", {})
+        g_epoca = replicacion.get("epoca", 0)
+        g_seq = replicacion.get("seq", 0)
         print("Datos cargados correctamente.\n")
         
     except FileNotFoundError:
@@ -151,18 +204,631 @@ def cargar_estado_desde_JSON():
         g_colas = {}
 
 
-def enviar_mensaje_callback(url_callback, mensaje):
+def hash_clave(clave):
+    """
+    Hash estable (no depende de PYTHONHASHSEED) para colocar claves en el anillo.
+    """
+    return int(hashlib.md5(clave.encode()).hexdigest()[:16], 16)
+
+
+def construir_anillo(nodos):
+    """
+    Construye el anillo de hash consistente con varios nodos virtuales por nodo,
+    para que las colas se repartan de forma uniforme.
+    """
+    anillo = []
+    for url_nodo in nodos:
+        for i in range(NODOS_VIRTUALES):
+            anillo.append((hash_clave(f"{url_nodo}#{i}"), url_nodo))
+    anillo.sort()
+    return anillo
+
+
+def nodo_propietario(nombre_cola):
+    """
+    Devuelve la URL del nodo al que pertenece la cola. Sin clúster, este mismo nodo.
+    """
+    if not g_anillo:
+        return NODO_URL
+    idx = bisect.bisect(g_anillo, (hash_clave(nombre_cola), "")) % len(g_anillo)
+    return g_anillo[idx][1]
+
+
+def otros_nodos():
+    """
+    URLs del resto de nodos del clúster.
+    """
+    return sorted({url_nodo for _, url_nodo in g_anillo} - {NODO_URL})
+
+
+def reenviar_peticion(url_nodo):
+    """
+    Reenvía la petición en curso tal cual (método, ruta, cabeceras y cuerpo) a otro
+    nodo y devuelve su respuesta.
+    """
+    cabeceras = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length")}
+    cabeceras["X-Reenviado"] = "1"
+    try:
+        r = g_sesion.request(
+            request.method,
+            url_nodo + request.full_path.rstrip("?"),
+            data=request.get_data(),
+            headers=cabeceras,
+            timeout=TIMEOUT_QUORUM + 5
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"Error al reenviar a {url_nodo}: {e}")
+        return jsonify({"error": f"Nodo {url_nodo} no disponible"}), 502
+    return r.content, r.status_code, {"Content-Type": r.headers.get("Content-Type", "application/json")}
+
+
+def reenviar_si_ajena(nombre_cola):
+    """
+    Si la cola pertenece a otro nodo, o este nodo es un seguidor, reenvía la petición
+    y devuelve su respuesta. Devuelve None si la petición debe atenderse aquí. Las
+    peticiones ya reenviadas se atienden siempre localmente para evitar bucles.
+    """
+    if g_rol == "seguidor":
+        if not g_lider_url:
+            return jsonify({"error": "Réplica sin líder conocido"}), 503
+        return reenviar_peticion(g_lider_url)
+    if request.headers.get("X-Reenviado"):
+        return None
+    propietario = nodo_propietario(nombre_cola)
+    if propietario == NODO_URL:
+        return None
+    print(f"Cola '{nombre_cola}' pertenece a {propietario}. Reenviando {request.path}.")
+    return reenviar_peticion(propietario)
+
+
+def consultar_otros_nodos(ruta):
+    """
+    Hace GET de la ruta (en modo local) en el resto de nodos y devuelve sus respuestas JSON.
+    Los nodos que no responden se omiten.
+    """
+    respuestas = []
+    for url_nodo in otros_nodos():
+        try:
+            r = g_sesion.get(f"{url_nodo}{ruta}", params={"local": 1}, timeout=3)
+            r.raise_for_status()
+            respuestas.append(r.json())
+        except requests.exceptions.RequestException as e:
+            print(f"No se pudo consultar {url_nodo}: {e}")
+    return respuestas
+
+
+def nuevo_consumidor():
+    """
+    Estado de un consumidor recién suscrito. Un consumidor aparcado no recibe
+    mensajes hasta que manda un latido pasado 'aparcado_hasta'.
+    """
+    return {
+        "unacked_count": 0,
+        "ultimo_latido": time.time(),
+        "fallos": 0,
+        "aparcado": False,
+        "aparcado_hasta": 0,
+        "veces_aparcado": 0
+    }
+
+
+def reencolar_de_consumidor(cola, url_callback, message_id=None):
+    """
+    Devuelve a la cabeza de la cola los mensajes en vuelo del consumidor (o solo
+    message_id). Devuelve True si alguno era duradero. Se llama con el lock adquirido.
+    """
+    cambios_durables = False
+    for msg_id, datos_sinACK in list(cola["unacked"].items()):
+        if datos_sinACK["consumer_url"] != url_callback:
+            continue
+        if message_id is not None and msg_id != message_id:
+            continue
+
+        mensaje_obj = datos_sinACK["mensaje_obj"]
+        encolar(cola, mensaje_obj, al_principio=True)
+        del cola["unacked"][msg_id]
+        if url_callback in cola["consumidores"]:
+            cola["consumidores"][url_callback]["unacked_count"] -= 1
+
+        if mensaje_obj.get("is_durable", False):
+            cambios_durables = True
+    return cambios_durables
+
+
+def registrar_fallo_entrega(nombre_cola, url_callback, message_id):
+    """
+    Re-encola en el momento el mensaje que no se pudo entregar. Tras MAX_FALLOS_ENTREGA
+    fallos seguidos se aparca al consumidor y se re-encolan todos sus mensajes en vuelo.
+    Cada aparcamiento seguido dura el doble que el anterior.
+    """
+    with g_lock:
+        if nombre_cola not in g_colas:
+            return
+        cola = g_colas[nombre_cola]
+        consumidor = cola["consumidores"].get(url_callback)
+
+        if consumidor:
+            consumidor["fallos"] += 1
+        if consumidor and consumidor["fallos"] >= MAX_FALLOS_ENTREGA:
+            tiempo = min(TIEMPO_APARCADO * 2 ** consumidor["veces_aparcado"], MAX_TIEMPO_APARCADO)
+            consumidor["aparcado"] = True
+            consumidor["aparcado_hasta"] = time.time() + tiempo
+            consumidor["veces_aparcado"] += 1
+            print(f"Consumidor {url_callback} aparcado {tiempo}s tras {consumidor['fallos']} fallos de entrega.")
+            cambios_durables = reencolar_de_consumidor(cola, url_callback)
+        else:
+            cambios_durables = reencolar_de_consumidor(cola, url_callback, message_id)
+
+        if cambios_durables:
+            guardar_JSON()
+
+    intentar_entrega(nombre_cola)
+
+
+def marcar_consumidor_vivo(cola, url_callback):
+    """
+    Anota actividad del consumidor. Se llama con el lock adquirido.
+    """
+    consumidor = cola["consumidores"].get(url_callback)
+    if consumidor:
+        consumidor["ultimo_latido"] = time.time()
+        consumidor["fallos"] = 0
+
+
+def nueva_cola(durable):
+    """
+    Estructura en memoria de una cola vacía.
+    """
+    return {
+        "mensajes": deque(),
+        "consumidores": {},
+        "indice_rr": 0,
+        "unacked": {},
+        "durable": durable,
+        "stats": nuevas_estadisticas()
+    }
+
+
+def nuevas_estadisticas():
+    """
+    Contadores de una cola. Se actualizan al encolar, entregar y confirmar
+    mensajes para que las estadísticas no tengan que recorrer la cola.
+    'bytes' es el tamaño de los payloads pendientes de entrega (los bytes tal
+    cual si son binarios, o el payload codificado en JSON).
+    """
+    return {
+        "bytes": 0,
+        "publicados": 0,
+        "entregados": 0,
+        "ackeados": 0,
+        "tasa_publicacion": 0.0,
+        "tasa_ack": 0.0,
+        "ultima_muestra": (time.time(), 0, 0)
+    }
+
+
+def encolar(cola, mensaje_obj, al_principio=False):
+    """
+    Añade un mensaje pendiente a la cola manteniendo los contadores.
+    Se llama con el lock adquirido.
+    """
+    if al_principio:
+        cola["mensajes"].appendleft(mensaje_obj)
+    else:
+        cola["mensajes"].append(mensaje_obj)
+    cola["stats"]["bytes"] += mensaje_obj["tamano"]
+
+
+def desencolar(cola):
+    """
+    Saca el primer mensaje pendiente manteniendo los contadores.
+    Se llama con el lock adquirido.
+    """
+    mensaje_obj = cola["mensajes"].popleft()
+    cola["stats"]["bytes"] -= mensaje_obj["tamano"]
+    return mensaje_obj
+
+
+def actualizar_tasas(cola):
+    """
+    Recalcula los mensajes/s publicados y confirmados desde la última muestra.
+    Se llama con el lock adquirido desde el hilo de limpieza.
+    """
+    stats = cola["stats"]
+    ahora = time.time()
+    t_anterior, publicados_anterior, ackeados_anterior = stats["ultima_muestra"]
+    transcurrido = ahora - t_anterior
+    if transcurrido <= 0:
+        return
+    stats["tasa_publicacion"] = (stats["publicados"] - publicados_anterior) / transcurrido
+    stats["tasa_ack"] = (stats["ackeados"] - ackeados_anterior) / transcurrido
+    stats["ultima_muestra"] = (ahora, stats["publicados"], stats["ackeados"])
+
+
+def estadisticas_cola(nombre_cola, cola):
+    """
+    Resumen de una cola a partir de los contadores. No toma g_lock ni recorre los
+    mensajes (solo los consumidores), así que los valores pueden estar
+    ligeramente desfasados entre sí.
+    """
+    stats = cola["stats"]
+    aparcados = sum(1 for c in list(cola["consumidores"].values()) if c["aparcado"])
+    try:
+        antiguedad = (datetime.now() - cola["mensajes"][0]["timestamp"]).total_seconds()
+    except IndexError:
+        antiguedad = 0.0
+    return {
+        "cola": nombre_cola,
+        "nodo": NODO_URL,
+        "durable": cola["durable"],
+        "profundidad": len(cola["mensajes"]),
+        "bytes": stats["bytes"],
+        "unacked": len(cola["unacked"]),
+        "consumidores": len(cola["consumidores"]) - aparcados,
+        "consumidores_aparcados": aparcados,
+        "publicados": stats["publicados"],
+        "entregados": stats["entregados"],
+        "ackeados": stats["ackeados"],
+        "tasa_publicacion": round(stats["tasa_publicacion"], 2),
+        "tasa_ack": round(stats["tasa_ack"], 2),
+        "antiguedad_mas_antiguo": round(antiguedad, 3)
+    }
+
+
+def registrar_evento(evento):
+    """
+    Añade un cambio duradero al log de replicación y devuelve su número de secuencia
+    (0 si no hay seguidores). Se llama con el lock adquirido.
+    """
+    global g_seq
+    if len(g_replicas) < 2 or g_rol != "lider":
+        return 0
+    g_seq += 1
+    g_log_replicacion.append(evento)
+    if len(g_log_replicacion) > MAX_LOG_REPLICACION:
+        g_log_replicacion.popleft()
+    g_cond_replicacion.notify_all()
+    return g_seq
+
+
+def quorum_alcanzado(seq):
+    """
+    Indica si al menos QUORUM_ACK seguidores han confirmado el evento seq.
+    Se llama con el lock adquirido.
+    """
+    return sum(1 for c in g_confirmado.values() if c is not None and c >= seq) >= QUORUM_ACK
+
+
+def esperar_quorum(seq):
+    """
+    Espera a que QUORUM_ACK seguidores confirmen el evento seq.
+    Devuelve False si no se alcanza antes de TIMEOUT_QUORUM, o en cuanto este
+    nodo deja de ser líder o cambia la época (el evento ya no se confirmará).
+    """
+    if not seq or QUORUM_ACK == 0:
+        return True
+    epoca = g_epoca
+    with g_cond_replicacion:
+        g_cond_replicacion.wait_for(
+            lambda: g_epoca != epoca or g_rol != "lider" or quorum_alcanzado(seq),
+            timeout=TIMEOUT_QUORUM
+        )
+        return g_epoca == epoca and g_rol == "lider" and quorum_alcanzado(seq)
+
+
+def recortar_log_replicacion():
+    """
+    Descarta los eventos que ya han confirmado todos los seguidores al día.
+    Se llama con el lock adquirido.
+    """
+    confirmados = [c for c in g_confirmado.values() if c is not None]
+    minimo = min(confirmados, default=g_seq)
+    while g_log_replicacion and g_seq - len(g_log_replicacion) < minimo:
+        g_log_replicacion.popleft()
+
+
+def requiere_instantanea(url_seguidor):
+    """
+    Indica si el seguidor necesita una instantánea completa: no se sabe dónde está
+    o sus eventos ya no están en el log. Se llama con el lock adquirido.
+    """
+    confirmado = g_confirmado.get(url_seguidor)
+    base = g_seq - len(g_log_replicacion)
+    return confirmado is None or confirmado < base or confirmado > g_seq
+
+
+def preparar_lote(url_seguidor):
+    """
+    Siguiente envío para un seguidor: los eventos que le faltan, o una instantánea
+    completa si requiere_instantanea. Se llama con el lock adquirido.
+    """
+    confirmado = g_confirmado.get(url_seguidor)
+    base = g_seq - len(g_log_replicacion)
+    if requiere_instantanea(url_seguidor):
+        return {
+            "lider": NODO_URL,
+            "epoca": g_epoca,
+            "hasta": g_seq,
+            "snapshot": estado_a_json_serializable(g_colas)
+        }
+    eventos = list(itertools.islice(
+        g_log_replicacion, confirmado - base, confirmado - base + LOTE_REPLICACION
+    ))
+    return {
+        "lider": NODO_URL,
+        "epoca": g_epoca,
+        "desde": confirmado,
+        "hasta": confirmado + len(eventos),
+        "eventos": eventos
+    }
+
+
+def hilo_replicacion(url_seguidor):
+    """
+    Envía a un seguidor, en lotes, los eventos del log. Hay un solo lote en vuelo
+    por seguidor; mientras se espera la respuesta se siguen acumulando eventos,
+    que salen juntos en el siguiente lote. Sin eventos, el lote vacío sirve de latido.
+    Si el seguidor no responde, los reintentos se espacian de forma exponencial,
+    salvo que el seguidor avise por /replicacion/unirse de que ha vuelto.
+    """
+    global g_rol, g_lider_url, g_ultimo_contacto_lider
+    espera = 1
+    while True:
+        with g_cond_replicacion:
+            g_cond_replicacion.wait_for(
+                lambda: g_rol == "lider" and g_confirmado.get(url_seguidor, 0) != g_seq,
+                timeout=INTERVALO_LATIDO_LIDER
+            )
+            if g_rol != "lider":
+                continue
+            instantanea = requiere_instantanea(url_seguidor)
+
+        # La instantánea se construye con el lock adquirido: solo si el seguidor responde.
+        if instantanea and not consultar_estado(url_seguidor):
+            espera = esperar_reintento(url_seguidor, espera)
+            continue
+
+        with g_cond_replicacion:
+            if g_rol != "lider":
+                continue
+            lote = preparar_lote(url_seguidor)
+
+        try:
+            r = g_sesion.post(f"{url_seguidor}/replicar", json=lote, timeout=5)
+        except requests.exceptions.RequestException:
+            espera = esperar_reintento(url_seguidor, espera)
+            continue
+
+        with g_cond_replicacion:
+            if g_epoca != lote["epoca"]:
+                continue
+            if r.status_code == 200:
+                g_confirmado[url_seguidor] = r.json()["hasta"]
+                recortar_log_replicacion()
+                g_cond_replicacion.notify_all()
+            elif r.status_code == 409 and r.json().get("epoca", -1) > g_epoca:
+                # Hay un líder con un mandato posterior: este nodo deja de liderar
+                # y vigilar_lider buscará al líder actual en la siguiente vuelta.
+                print(f"{url_seguidor} conoce la época {r.json()['epoca']}. Dejando de ser líder.")
+                g_rol = "seguidor"
+                g_lider_url = None
+                g_ultimo_contacto_lider = 0
+                g_cond_replicacion.notify_all()
+            else:
+                print(f"{url_seguidor} rechaza la replicación ({r.status_code}). Se le enviará una instantánea.")
+                g_confirmado[url_seguidor] = None
+
+        if r.status_code == 200:
+            espera = 1
+        else:
+            espera = esperar_reintento(url_seguidor, espera)
+
+
+def esperar_reintento(url_seguidor, espera):
+    """
+    Espera antes de reintentar con un seguidor y devuelve la siguiente espera
+    (el doble, con tope). Si el seguidor avisa de que ha vuelto, la espera se
+    corta y vuelve a empezar desde 1 segundo.
+    """
+    despertar = g_despertar[url_seguidor]
+    if despertar.wait(espera):
+        despertar.clear()
+        return 1
+    return min(espera * 2, MAX_ESPERA_REPLICACION)
+
+
+def aplicar_evento(evento):
+    """
+    Aplica en un seguidor un cambio duradero del líder. Se llama con el lock adquirido.
+    En el seguidor todos los mensajes no eliminados quedan pendientes, igual que tras
+    un reinicio.
+    """
+    nombre_cola = evento["cola"]
+    if evento["op"] == "declarar":
+        if nombre_cola not in g_colas:
+            g_colas[nombre_cola] = nueva_cola(True)
+    elif evento["op"] == "borrar":
+        g_colas.pop(nombre_cola, None)
+    elif nombre_cola in g_colas:
+        cola = g_colas[nombre_cola]
+        if evento["op"] == "publicar":
+            encolar(cola, json_a_mensaje(evento["mensaje"]))
+        elif evento["op"] == "eliminar":
+            for i, mensaje_obj in enumerate(cola["mensajes"]):
+                if mensaje_obj["id"] == evento["id"]:
+                    del cola["mensajes"][i]
+                    cola["stats"]["bytes"] -= mensaje_obj["tamano"]
+                    break
+        elif evento["op"] == "purgar":
+            # Se conservan los que el líder tenía en vuelo.
+            conservar = set(evento["conservar"])
+            mensajes = deque(m for m in cola["mensajes"] if m["id"] in conservar)
+            cola["mensajes"] = mensajes
+            cola["stats"]["bytes"] = sum(m["tamano"] for m in mensajes)
+
+
+def prioridad(url_nodo):
+    """
+    Posición del nodo en el grupo de réplica (menor es más prioritario).
+    """
+    return g_replicas.index(url_nodo) if url_nodo in g_replicas else len(g_replicas)
+
+
+def consultar_estado(url_nodo):
+    """
+    Devuelve el /replicacion/estado de otra réplica, o None si no responde.
+    """
+    try:
+        r = g_sesion.get(f"{url_nodo}/replicacion/estado", timeout=1)
+        r.raise_for_status()
+        return r.json()
+    except requests.exceptions.RequestException:
+        return None
+
+
+def elegir_lider():
+    """
+    Consulta a las réplicas vivas y devuelve (url_lider, estados). Si alguna
+    otra réplica ya es líder se elige la de mayor época. Si no, la réplica viva
+    más avanzada en el log (época, secuencia) y, a igualdad, la más prioritaria.
+    Así nunca se promociona un nodo al que le faltan eventos confirmados que
+    tiene otra réplica viva.
+    """
+    estados = {NODO_URL: {"rol": g_rol, "epoca": g_epoca, "seq": g_seq}}
+    for url_nodo in g_replicas:
+        if url_nodo != NODO_URL:
+            estado = consultar_estado(url_nodo)
+            if estado:
+                estados[url_nodo] = estado
+
+    lideres = [url for url, e in estados.items() if url != NODO_URL and e["rol"] == "lider"]
+    if lideres:
+        return max(lideres, key=lambda url: estados[url]["epoca"]), estados
+    return max(
+        estados, key=lambda url: (estados[url]["epoca"], estados[url]["seq"], -prioridad(url))
+    ), estados
+
+
+def seguir_a(url_lider):
+    """
+    Pasa a seguir a url_lider y le avisa para que empiece a replicarnos sin
+    esperar a su siguiente reintento. Hasta ponernos al día con él, este nodo
+    no se promociona porque siempre habrá un líder vivo que elegir.
+    """
+    global g_rol, g_lider_url, g_ultimo_contacto_lider
+    with g_lock:
+        g_rol, g_lider_url = "seguidor", url_lider
+        g_ultimo_contacto_lider = time.time()
+    try:
+        g_sesion.post(f"{url_lider}/replicacion/unirse", json={"url": NODO_URL}, timeout=2)
+    except requests.exceptions.RequestException as e:
+        print(f"No se pudo avisar a {url_lider}: {e}")
+
+
+def promover_a_lider(epoca_nueva):
+    """
+    Convierte este seguidor en líder con la época indicada. Los seguidores
+    recibirán primero una instantánea.
+    """
+    global g_rol, g_lider_url, g_epoca
+    with g_cond_replicacion:
+        g_rol = "lider"
+        g_lider_url = NODO_URL
+        g_epoca = epoca_nueva
+        guardar_JSON()
+        g_log_replicacion.clear()
+        for url_seguidor in g_confirmado:
+            g_confirmado[url_seguidor] = None
+        g_cond_replicacion.notify_all()
+        colas_a_revisar = list(g_colas.keys())
+    print(f"\nPromocionado a líder ({NODO_URL}, época {epoca_nueva}).\n")
+
+    for nombre_cola in colas_a_revisar:
+        intentar_entrega(nombre_cola)
+
+
+def vigilar_lider():
+    """
+    Si el seguidor deja de recibir lotes del líder, se repite la elección: se
+    sigue a un líder vivo si lo hay y, si no, se promociona la réplica más avanzada.
+    """
+    global g_ultimo_contacto_lider
+    while True:
+        time.sleep(1)
+        if g_rol != "seguidor" or time.time() - g_ultimo_contacto_lider < TIMEOUT_LIDER:
+            continue
+
+        print(f"Sin noticias del líder {g_lider_url} en {TIMEOUT_LIDER}s.")
+        candidato, estados = elegir_lider()
+        if candidato == NODO_URL:
+            promover_a_lider(max(e["epoca"] for e in estados.values()) + 1)
+        elif estados[candidato]["rol"] == "lider":
+            seguir_a(candidato)
+        else:
+            # Damos tiempo a que el candidato se promocione y nos contacte.
+            print(f"Esperando a que {candidato} asuma el liderazgo.")
+            g_ultimo_contacto_lider = time.time()
+
+
+def iniciar_replicacion():
+    """
+    Decide el rol inicial con la misma elección que tras una caída (se sigue a
+    un líder existente; si no hay, lidera la réplica viva más avanzada) y arranca
+    los hilos de replicación.
+    """
+    global g_rol, g_lider_url, g_ultimo_contacto_lider
+    for url_seguidor in g_replicas:
+        if url_seguidor != NODO_URL:
+            g_confirmado[url_seguidor] = None
+            g_despertar[url_seguidor] = threading.Event()
+
+    candidato, estados = elegir_lider()
+    if candidato == NODO_URL:
+        promover_a_lider(max(e["epoca"] for e in estados.values()) + 1)
+    elif estados[candidato]["rol"] == "lider":
+        seguir_a(candidato)
+    else:
+        g_rol, g_lider_url = "seguidor", None
+        g_ultimo_contacto_lider = time.time()
+    print(f"Réplica {NODO_URL} arranca como {g_rol} (líder: {g_lider_url}, quorum: {QUORUM_ACK}).")
+
+    for url_seguidor in g_replicas:
+        if url_seguidor != NODO_URL:
+            threading.Thread(target=hilo_replicacion, args=(url_seguidor,), daemon=True).start()
+    threading.Thread(target=vigilar_lider, daemon=True).start()
+
+
+def enviar_mensaje_callback(nombre_cola, url_callback, mensaje):
     """
     Función llamada en un hilo que manda el mensaje y su id al consumidor.
+    Si falla (sin respuesta o con un código distinto de 2xx), el mensaje se
+    re-encola sin esperar a TIMEOUT_ACK.
     """
     try:
-        requests.post(url_callback, json={
-            "mensaje": mensaje["payload"],
-            "message_id": mensaje["id"]
-        }, timeout=3)
+        if mensaje.get("binario", False):
+            # El cuerpo binario se reenvía tal cual, sin pasar por JSON.
+            r = requests.post(url_callback, data=mensaje["payload"], headers={
+                "Content-Type": "application/octet-stream",
+                "X-Message-Id": mensaje["id"]
+            }, timeout=3)
+        else:
+            r = requests.post(url_callback, json={
+                "mensaje": mensaje["payload"],
+                "message_id": mensaje["id"]
+            }, timeout=3)
+        r.raise_for_status()
         print(f"Mensaje {mensaje['id']} enviado a {url_callback}")
     except requests.exceptions.RequestException as e:
         print(f"Error al enviar {mensaje['id']} a {url_callback}: {e}")
+        registrar_fallo_entrega(nombre_cola, url_callback, mensaje["id"])
+        return
+
+    with g_lock:
+        if nombre_cola in g_colas:
+            cola = g_colas[nombre_cola]
+            marcar_consumidor_vivo(cola, url_callback)
+            if url_callback in cola["consumidores"]:
+                cola["consumidores"][url_callback]["veces_aparcado"] = 0
 
 
 def intentar_entrega(nombre_cola):
@@ -172,7 +838,7 @@ def intentar_entrega(nombre_cola):
     cambios_durables = False
     
     with g_lock:
-        if nombre_cola not in g_colas:
+        if nombre_cola not in g_colas or g_rol == "seguidor":
             return
         
         cola = g_colas[nombre_cola]
@@ -192,7 +858,7 @@ def intentar_entrega(nombre_cola):
                 idx = (start_index + i) % len(consumidores_lista)
                 url, estado = consumidores_lista[idx]
                 
-                if estado["unacked_count"] < PREFETCH_COUNT:
+                if not estado["aparcado"] and estado["unacked_count"] < PREFETCH_COUNT:
                     consumidor_disponible = (url, estado)
                     indice_encontrado = idx
                     break 
@@ -204,7 +870,8 @@ def intentar_entrega(nombre_cola):
             cola["indice_rr"] = (indice_encontrado + 1) % len(consumidores_lista)
             
             url_callback, estado_consumidor = consumidor_disponible
-            mensaje_obj = cola["mensajes"].popleft()
+            mensaje_obj = desencolar(cola)
+            cola["stats"]["entregados"] += 1
             
             timestamp_envio = datetime.now()
             
@@ -221,7 +888,7 @@ def intentar_entrega(nombre_cola):
             
             threading.Thread(
                 target=enviar_mensaje_callback, 
-                args=(url_callback, mensaje_obj)
+                args=(nombre_cola, url_callback, mensaje_obj)
             ).start()
             print(f"Mensaje {mensaje_obj['id']} asignado a {url_callback} (unacked: {estado_consumidor['unacked_count']})")
             
@@ -235,6 +902,10 @@ def limpiar_y_reencolar():
     """
     while True:
         time.sleep(10)
+
+        # Los seguidores solo aplican lo que decide el líder.
+        if g_rol == "seguidor":
+            continue
         
         ahora = datetime.now()
         colas_con_novedades = set()
@@ -243,6 +914,17 @@ def limpiar_y_reencolar():
         with g_lock:
             for nombre_cola, cola in list(g_colas.items()):
 
+                actualizar_tasas(cola)
+
+                # Expulsamos a los consumidores sin actividad y re-encolamos sus mensajes en vuelo.
+                for url_callback, consumidor in list(cola["consumidores"].items()):
+                    if time.time() - consumidor["ultimo_latido"] > TIMEOUT_LATIDO:
+                        print(f"Consumidor {url_callback} sin latidos en {TIMEOUT_LATIDO}s. Expulsado de '{nombre_cola}'.")
+                        if reencolar_de_consumidor(cola, url_callback):
+                            cambios_en_duraderos = True
+                        del cola["consumidores"][url_callback]
+                        colas_con_novedades.add(nombre_cola)
+
                 # Limpiamos mensajes que lleven más de 5 minutos sin ser consumidos.
                 if not cola["consumidores"]:
                     mensajes_activos = deque()
@@ -252,9 +934,11 @@ def limpiar_y_reencolar():
                             mensajes_activos.append(mensaje_obj)
                         else:
                             print(f"Mensaje {mensaje_obj['id']} eliminado de {nombre_cola} por caducidad (5 min).")
+                            cola["stats"]["bytes"] -= mensaje_obj["tamano"]
                             
                             if mensaje_obj.get("is_durable", False):
                                 cambios_en_duraderos = True
+                                registrar_evento({"op": "eliminar", "cola": nombre_cola, "id": mensaje_obj["id"]})
                     cola["mensajes"] = mensajes_activos
 
                 # Re-encolamos mensajes sin ACK que hay superado el timeout.
@@ -266,7 +950,7 @@ def limpiar_y_reencolar():
                         
                         print(f"TIMEOUT en ACK para {msg_id}. Re-encolando.")
                         
-                        cola["mensajes"].appendleft(mensaje_obj)
+                        encolar(cola, mensaje_obj, al_principio=True)
                         if consumer_url in cola["consumidores"]:
                             cola["consumidores"][consumer_url]["unacked_count"] -= 1
                         
@@ -288,6 +972,11 @@ def limpiar_y_reencolar():
 def declarar_cola():
     """
     Declara una cola con un nombre y si es duradera o no.
+
+    Con replicación, si no se alcanza el quorum se responde 504: la cola queda
+    creada en el líder pero sin replicar. Declarar es idempotente, así que el
+    cliente puede reintentar sin efectos secundarios; el reintento espera al
+    quorum del mismo evento de declaración.
     """
     data = request.json
     nombre_cola = data.get('nombre')
@@ -295,21 +984,30 @@ def declarar_cola():
     
     if not nombre_cola:
         return jsonify({"error": "Falta 'nombre'"}), 400
+
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
         
+    seq = 0
     with g_lock:
         if nombre_cola not in g_colas:
-            g_colas[nombre_cola] = {
-                "mensajes": deque(),
-                "consumidores": {},
-                "indice_rr": 0,
-                "unacked": {},
-                "durable": durable
-            }
+            g_colas[nombre_cola] = nueva_cola(durable)
             if durable:
                 guardar_JSON() 
+                seq = registrar_evento({"op": "declarar", "cola": nombre_cola})
+                g_colas[nombre_cola]["seq_declaracion"] = seq
             print(f"\nCola '{nombre_cola}' (Durable: {durable}) creada.\n")
         else:
+            seq = g_colas[nombre_cola].get("seq_declaracion", 0)
             print(f"\nCola '{nombre_cola}' ya existe (idempotente).\n")
+
+    if not esperar_quorum(seq):
+        return jsonify({
+            "error": "quorum de replicación no alcanzado",
+            "status": "cola creada en el líder, no replicada",
+            "cola": nombre_cola
+        }), 504
             
     return jsonify({"status": "ok", "cola": nombre_cola}), 200
 
@@ -319,15 +1017,35 @@ def publicar():
     """
     Publicamos un mensaje en una cola y si es duradero (tanto cola como mensaje) 
     lo guardamos en el JSON.
+
+    Si el Content-Type es application/octet-stream el cuerpo se guarda como
+    bytes opacos y los metadatos se leen de las cabeceras X-Cola y X-Durable.
+    Un cuerpo binario vacío es un mensaje válido (igual que "" en JSON).
+
+    Con replicación y quorum, un mensaje duradero no entra en la cola (ni se
+    entrega) hasta que lo confirman los seguidores. Si no se alcanza el quorum
+    se descarta y se responde 504, así que el productor puede reintentar sin
+    duplicados.
     """
-    data = request.json
-    nombre_cola = data.get('nombre')
-    mensaje = data.get('mensaje')
-    durable_msg = bool(data.get('durable', False))
+    binario = request.mimetype == "application/octet-stream"
+    if binario:
+        nombre_cola = request.headers.get('X-Cola')
+        mensaje = request.get_data()
+        durable_msg = request.headers.get('X-Durable', '').lower() in ("1", "true")
+    else:
+        data = request.json
+        nombre_cola = data.get('nombre')
+        mensaje = data.get('mensaje')
+        durable_msg = bool(data.get('durable', False))
     
     if not nombre_cola or mensaje is None:
         return jsonify({"error": "Faltan 'nombre' o 'mensaje'"}), 400
+
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
     
+    seq = 0
     with g_lock:
         if nombre_cola not in g_colas:
             print(f"Mensaje para cola '{nombre_cola}' (inexistente) perdido.")
@@ -343,16 +1061,42 @@ def publicar():
             "id": str(uuid.uuid4()),
             "payload": mensaje,
             "timestamp": datetime.now(),
-            "is_durable": mensaje_es_duradero
+            "is_durable": mensaje_es_duradero,
+            "binario": binario,
+            "tamano": len(mensaje) if binario else len(json.dumps(mensaje))
         }
         
-        cola["mensajes"].append(mensaje_obj_ram)
-        
-        # El guardado solo depende de 'mensaje_es_duradero'
         if mensaje_es_duradero:
-            guardar_JSON() 
+            seq = registrar_evento({"op": "publicar", "cola": nombre_cola, "mensaje": mensaje_a_json(mensaje_obj_ram)})
+
+        esperar_replicacion = seq and QUORUM_ACK
+        if not esperar_replicacion:
+            encolar(cola, mensaje_obj_ram)
+            cola["stats"]["publicados"] += 1
+
+            # El guardado solo depende de 'mensaje_es_duradero'
+            if mensaje_es_duradero:
+                guardar_JSON() 
 
         print(f"Mensaje {mensaje_obj_ram['id']} (Durable: {mensaje_es_duradero}) recibido para '{nombre_cola}'")
+
+    if esperar_replicacion:
+        replicado = esperar_quorum(seq)
+        with g_lock:
+            if not replicado:
+                registrar_evento({"op": "eliminar", "cola": nombre_cola, "id": mensaje_obj_ram["id"]})
+            elif nombre_cola in g_colas:
+                cola = g_colas[nombre_cola]
+                encolar(cola, mensaje_obj_ram)
+                cola["stats"]["publicados"] += 1
+                guardar_JSON()
+            else:
+                print(f"Cola '{nombre_cola}' borrada mientras se replicaba {mensaje_obj_ram['id']}. Mensaje perdido.")
+                return jsonify({"status": "mensaje perdido (cola no existe)"}), 404
+
+        if not replicado:
+            print(f"Quorum no alcanzado para {mensaje_obj_ram['id']}. Mensaje descartado.")
+            return jsonify({"error": "quorum de replicación no alcanzado, mensaje descartado"}), 504
     
     intentar_entrega(nombre_cola)
     return jsonify({"status": "mensaje publicado"}), 200
@@ -370,12 +1114,16 @@ def consumir():
     if not nombre_cola or not url_callback:
         return jsonify({"error": "Faltan 'nombre' o 'callback_url'"}), 400
 
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
     with g_lock:
         if nombre_cola not in g_colas:
             return jsonify({"error": "Cola no existe. Declárala primero."}), 404
         
         if url_callback not in g_colas[nombre_cola]["consumidores"]:
-            g_colas[nombre_cola]["consumidores"][url_callback] = {"unacked_count": 0}
+            g_colas[nombre_cola]["consumidores"][url_callback] = nuevo_consumidor()
             print(f"Nuevo consumidor {url_callback} suscrito a '{nombre_cola}'\n")
         else:
             print(f"Consumidor {url_callback} ya estaba suscrito a '{nombre_cola}'\n")
@@ -384,6 +1132,44 @@ def consumir():
     return jsonify({"status": "suscrito correctamente"}), 200
 
 
+@app.route('/latido', methods=['POST'])
+def latido():
+    """
+    Latido de un consumidor. Si estaba aparcado y ya pasó su tiempo de
+    aparcamiento, se reactiva con una sola oportunidad: un nuevo fallo de
+    entrega lo vuelve a aparcar. Si ya fue expulsado responde 404 para que
+    vuelva a suscribirse.
+    """
+    data = request.json
+    nombre_cola = data.get('nombre')
+    url_callback = data.get('callback_url')
+
+    if not nombre_cola or not url_callback:
+        return jsonify({"error": "Faltan 'nombre' o 'callback_url'"}), 400
+
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
+    reactivado = False
+    with g_lock:
+        if nombre_cola not in g_colas or url_callback not in g_colas[nombre_cola]["consumidores"]:
+            return jsonify({"error": "Consumidor no suscrito"}), 404
+
+        consumidor = g_colas[nombre_cola]["consumidores"][url_callback]
+        consumidor["ultimo_latido"] = time.time()
+        if consumidor["aparcado"] and time.time() >= consumidor["aparcado_hasta"]:
+            consumidor["aparcado"] = False
+            consumidor["fallos"] = MAX_FALLOS_ENTREGA - 1
+            reactivado = True
+            print(f"Consumidor {url_callback} reactivado en '{nombre_cola}'.")
+        aparcado = consumidor["aparcado"]
+
+    if reactivado:
+        intentar_entrega(nombre_cola)
+    return jsonify({"status": "ok", "aparcado": aparcado}), 200
+
+
 @app.route('/ack', methods=['POST'])
 def ack_mensaje():
     """
@@ -396,6 +1182,10 @@ def ack_mensaje():
     if not message_id or not nombre_cola:
         return jsonify({"error": "Faltan 'message_id' o 'nombre_cola'"}), 400
 
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
     ack_exitoso = False
     cambios_en_duraderos = False
     
@@ -408,13 +1198,16 @@ def ack_mensaje():
             if mensaje_ackeado:
                 print(f"ACK recibido para {message_id} en {nombre_cola}.")
                 ack_exitoso = True
+                cola["stats"]["ackeados"] += 1
                 
                 if mensaje_ackeado["mensaje_obj"].get("is_durable", False):
                     cambios_en_duraderos = True
+                    registrar_evento({"op": "eliminar", "cola": nombre_cola, "id": message_id})
                 
                 consumer_url = mensaje_ackeado["consumer_url"]
                 if consumer_url in cola["consumidores"]:
                     cola["consumidores"][consumer_url]["unacked_count"] -= 1
+                    marcar_consumidor_vivo(cola, consumer_url)
                 else:
                     print(f"Consumidor {consumer_url} que envió ACK ya no está suscrito.")
             else:
@@ -433,10 +1226,15 @@ def ack_mensaje():
 @app.route('/colas', methods=['GET'])
 def listar_colas():
     """
-    Devuelve la lista de colas existentes.
+    Devuelve la lista de colas existentes en todo el clúster.
+    Con ?local=1 solo las de este nodo.
     """
     with g_lock:
         nombres_colas = list(g_colas.keys())
+
+    if not request.args.get("local"):
+        for data in consultar_otros_nodos("/colas"):
+            nombres_colas.extend(data["colas"])
     print(f"\nSolicitud de listar colas. Total: {len(nombres_colas)}")
     return jsonify({"colas": nombres_colas}), 200
 
@@ -444,27 +1242,248 @@ def listar_colas():
 def borrar_cola(nombre_cola):
     """
     Borra la cola del estado y del JSON (si es durable).
+
+    Con replicación, si no se alcanza el quorum se responde 504. Un reintento
+    encuentra la cola ya borrada y antes de responder 404 espera a que los
+    seguidores confirmen todo el log, así que el 404 también implica que el
+    borrado está replicado.
     """
     print(f"\nSolicitud de borrado para cola: '{nombre_cola}'")
+
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
     
+    seq = 0
     with g_lock:
         cola_eliminada = g_colas.pop(nombre_cola, None)
     
         if cola_eliminada:
             if cola_eliminada.get("durable", False):
                 guardar_JSON() 
-            
-            print(f"Cola '{nombre_cola}' eliminada exitosamente.\n")
-            return jsonify({"status": "cola eliminada", "cola": nombre_cola}), 200
-        else:
-            print(f"Intento de borrar cola inexistente '{nombre_cola}'.\n")
+                seq = registrar_evento({"op": "borrar", "cola": nombre_cola})
+        elif g_replicas:
+            seq = g_seq
+
+    if not esperar_quorum(seq):
+        return jsonify({
+            "error": "quorum de replicación no alcanzado",
+            "status": "cola borrada en el líder, no replicada",
+            "cola": nombre_cola
+        }), 504
+
+    if cola_eliminada:
+        print(f"Cola '{nombre_cola}' eliminada exitosamente.\n")
+        return jsonify({"status": "cola eliminada", "cola": nombre_cola}), 200
+    print(f"Intento de borrar cola inexistente '{nombre_cola}'.\n")
+    return jsonify({"error": "cola no encontrada"}), 404
+
+
+@app.route('/colas/<string:nombre_cola>/stats', methods=['GET'])
+def stats_cola(nombre_cola):
+    """
+    Estadísticas de una cola, sin tomar el lock ni recorrer sus mensajes.
+    """
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
+    cola = g_colas.get(nombre_cola)
+    if not cola:
+        return jsonify({"error": "cola no encontrada"}), 404
+    return jsonify(estadisticas_cola(nombre_cola, cola)), 200
+
+
+@app.route('/stats', methods=['GET'])
+def stats_cluster():
+    """
+    Estadísticas de todas las colas del clúster. Con ?local=1 solo las de este nodo.
+    """
+    if g_rol == "seguidor" and g_lider_url and not request.headers.get("X-Reenviado"):
+        return reenviar_peticion(g_lider_url)
+
+    colas = [estadisticas_cola(nombre_cola, cola) for nombre_cola, cola in list(g_colas.items())]
+
+    if not request.args.get("local"):
+        for data in consultar_otros_nodos("/stats"):
+            colas.extend(data["colas"])
+    return jsonify({"colas": colas}), 200
+
+
+@app.route('/colas/<string:nombre_cola>/mensajes', methods=['DELETE'])
+def purgar_cola(nombre_cola):
+    """
+    Vacía los mensajes pendientes de la cola en O(1). Los mensajes en vuelo se conservan.
+
+    Con replicación, si no se alcanza el quorum se responde 504. Reintentar
+    registra otro evento de purga, así que un 200 siempre está replicado.
+    """
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
+    seq = 0
+    with g_lock:
+        if nombre_cola not in g_colas:
+            return jsonify({"error": "cola no encontrada"}), 404
+
+        cola = g_colas[nombre_cola]
+        purgados = len(cola["mensajes"])
+        cola["mensajes"] = deque()
+        cola["stats"]["bytes"] = 0
+
+        if cola["durable"]:
+            guardar_JSON()
+            seq = registrar_evento({"op": "purgar", "cola": nombre_cola, "conservar": list(cola["unacked"])})
+
+    if not esperar_quorum(seq):
+        return jsonify({
+            "error": "quorum de replicación no alcanzado",
+            "status": "cola purgada en el líder, no replicada",
+            "cola": nombre_cola
+        }), 504
+
+    print(f"Cola '{nombre_cola}' purgada ({purgados} mensajes).")
+    return jsonify({"status": "cola purgada", "cola": nombre_cola, "purgados": purgados}), 200
+
+
+@app.route('/colas/<string:nombre_cola>/mensajes', methods=['GET'])
+def ver_mensajes(nombre_cola):
+    """
+    Devuelve una página de mensajes pendientes sin sacarlos de la cola.
+    Parámetros: desde (posición inicial) y limite (máximo MAX_MENSAJES_PAGINA).
+    """
+    respuesta = reenviar_si_ajena(nombre_cola)
+    if respuesta:
+        return respuesta
+
+    try:
+        desde = max(0, int(request.args.get("desde", 0)))
+        limite = min(MAX_MENSAJES_PAGINA, max(1, int(request.args.get("limite", 20))))
+    except ValueError:
+        return jsonify({"error": "'desde' y 'limite' deben ser enteros"}), 400
+
+    with g_lock:
+        if nombre_cola not in g_colas:
             return jsonify({"error": "cola no encontrada"}), 404
 
+        mensajes = g_colas[nombre_cola]["mensajes"]
+        profundidad = len(mensajes)
+        pagina = [mensaje_a_json(m) for m in itertools.islice(mensajes, desde, desde + limite)]
+
+    siguiente = desde + len(pagina)
+    return jsonify({
+        "mensajes": pagina,
+        "desde": desde,
+        "siguiente": siguiente if siguiente < profundidad else None,
+        "profundidad": profundidad
+    }), 200
+
+
+@app.route('/replicar', methods=['POST'])
+def replicar():
+    """
+    Recibe del líder un lote de eventos (o una instantánea) y lo aplica y persiste.
+    """
+    global g_colas, g_rol, g_lider_url, g_epoca, g_seq, g_ultimo_contacto_lider
+    data = request.json
+
+    with g_cond_replicacion:
+        # Se rechaza a un líder de una época anterior (o de la misma, si este nodo
+        # también es líder y tiene más prioridad). El 409 lleva nuestra época para
+        # que el líder obsoleto deje de serlo.
+        if data["epoca"] < g_epoca or (
+            g_rol == "lider" and data["epoca"] == g_epoca and prioridad(data["lider"]) > prioridad(NODO_URL)
+        ):
+            return jsonify({"error": "líder obsoleto", "epoca": g_epoca}), 409
+
+        if g_rol == "lider":
+            print(f"\n{data['lider']} lidera la época {data['epoca']}. Pasando a seguidor.\n")
+            # Despierta a quien esperase un quorum que ya no llegará.
+            g_cond_replicacion.notify_all()
+        g_rol = "seguidor"
+        g_lider_url = data["lider"]
+        g_ultimo_contacto_lider = time.time()
+
+        if "snapshot" in data:
+            print(f"Instantánea recibida de {g_lider_url} (seq {data['hasta']}).")
+            g_colas = json_a_estado(data["snapshot"])
+        elif data["epoca"] != g_epoca or data["desde"] != g_seq:
+            return jsonify({"error": "fuera de secuencia", "epoca": g_epoca, "hasta": g_seq}), 409
+        else:
+            for evento in data["eventos"]:
+                aplicar_evento(evento)
+
+        g_epoca = data["epoca"]
+        g_seq = data["hasta"]
+        if "snapshot" in data or data["eventos"]:
+            guardar_JSON()
+
+    return jsonify({"epoca": g_epoca, "hasta": g_seq}), 200
+
+
+@app.route('/replicacion/estado', methods=['GET'])
+def estado_replicacion():
+    """
+    Rol de este nodo dentro del grupo de réplica.
+    """
+    return jsonify({"rol": g_rol, "lider": g_lider_url, "epoca": g_epoca, "seq": g_seq}), 200
+
+
+@app.route('/replicacion/unirse', methods=['POST'])
+def unirse_replicacion():
+    """
+    Un seguidor que vuelve avisa al líder para que corte la espera entre reintentos.
+    """
+    url_seguidor = request.json.get("url")
+    if g_rol == "lider" and url_seguidor in g_despertar:
+        g_despertar[url_seguidor].set()
+    return jsonify({"rol": g_rol, "lider": g_lider_url, "epoca": g_epoca, "seq": g_seq}), 200
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Broker de mensajes.")
+    parser.add_argument("--host", help="IP en la que escuchar (por defecto, la de la interfaz Wi-Fi).")
+    parser.add_argument("--puerto", type=int, default=5000, help="Puerto HTTP del broker.")
+    parser.add_argument("--nodos", default="", help="URLs de todos los nodos del clúster separadas por comas, incluido este.")
+    parser.add_argument("--archivo", default=ARCHIVO_JSON, help="Fichero de persistencia de este nodo.")
+    parser.add_argument("--replicas", default="", help="URLs del grupo de réplica por orden de prioridad, separadas por comas, incluido este.")
+    parser.add_argument("--quorum", type=int, default=1, help="Seguidores que deben confirmar cada cambio duradero.")
+    args = parser.parse_args()
+
+    ARCHIVO_JSON = args.archivo
+
     # Cargamos estado desde JSON.
     cargar_estado_desde_JSON()
     
+    # Softcodeamos la IP local del broker.
+    dir = args.host
+    if not dir:
+        for iface_name, iface_addrs in psutil.net_if_addrs().items():
+            if 'wi-fi' in iface_name.lower():
+                for addr in iface_addrs:
+                    if addr.family == socket.AF_INET:
+                        dir = addr.address
+
+    # Configuramos el clúster: cada cola pertenece a un nodo según el anillo.
+    NODO_URL = f"http://{dir}:{args.puerto}"
+    nodos = [n.strip().rstrip("/") for n in args.nodos.split(",") if n.strip()]
+    if nodos:
+        if NODO_URL not in nodos:
+            print(f"Aviso: {NODO_URL} no está en --nodos. Se añade al clúster.")
+            nodos.append(NODO_URL)
+        g_anillo = construir_anillo(nodos)
+        print(f"Clúster con {len(nodos)} nodos: {', '.join(nodos)}")
+
+    # Configuramos la replicación líder-seguidor de las colas duraderas.
+    g_replicas = [n.strip().rstrip("/") for n in args.replicas.split(",") if n.strip()]
+    if g_replicas:
+        if NODO_URL not in g_replicas:
+            print(f"Aviso: {NODO_URL} no está en --replicas. Se añade al final.")
+            g_replicas.append(NODO_URL)
+        QUORUM_ACK = max(0, min(args.quorum, len(g_replicas) - 1))
+        iniciar_replicacion()
+
     # Iniciamos el hilo de limpieza.
     hilo_limpieza = threading.Thread(target=limpiar_y_reencolar, daemon=True)
     hilo_limpieza.start()
@@ -477,15 +1496,8 @@ if __name__ == '__main__':
     for nombre_cola in colas_a_revisar:
         print(f"Intentando entrega para cola '{nombre_cola}'.")
         intentar_entrega(nombre_cola)
-    
-    # Softcodeamos la IP local del broker.
-    for iface_name, iface_addrs in psutil.net_if_addrs().items():
-        if 'wi-fi' in iface_name.lower():
-            for addr in iface_addrs:
-                if addr.family == socket.AF_INET:
-                    dir = addr.address
 
     # Iniciamos el servidor web
-    print(f"Broker iniciado en http://{dir}:5000\n")
+    print(f"Broker iniciado en {NODO_URL}\n")
 
-    app.run(host=dir, port=5000, debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host=dir, port=args.puerto, debug=True, use_reloader=False)
\ No newline at end of file
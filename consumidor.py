@@ -4,6 +4,8 @@ from flask import Flask, request, jsonify
 
 app_consumidor = Flask(__name__)
 
+INTERVALO_LATIDO = 5 # Debe ser bastante menor que TIMEOUT_LATIDO del broker.
+
 def procesar_mensaje_y_enviar_ack(message_id, mensaje):
     """
     Procesamos el mensaje y envía el ACK al broker.
@@ -32,10 +34,15 @@ def procesar_mensaje_y_enviar_ack(message_id, mensaje):
 def recibir_mensaje():
     """
     Recibimos los mensajes enviados por el broker.
+    Los mensajes binarios llegan como application/octet-stream con el id en cabecera.
     """
-    data = request.json
-    mensaje = data.get('mensaje')
-    message_id = data.get('message_id')
+    if request.mimetype == "application/octet-stream":
+        mensaje = request.get_data()
+        message_id = request.headers.get('X-Message-Id')
+    else:
+        data = request.json
+        mensaje = data.get('mensaje')
+        message_id = data.get('message_id')
     
     if not message_id:
         return jsonify({"status": "error", "reason": "no message_id"}), 400
@@ -78,12 +85,30 @@ def suscribirse_al_broker():
     except requests.exceptions.RequestException as e:
         print(f"Error al suscribirse: {e}")
 
+def enviar_latidos():
+    """
+    Mandamos latidos periódicos al broker. Si nos ha expulsado, volvemos a suscribirnos.
+    """
+    while True:
+        time.sleep(INTERVALO_LATIDO)
+        try:
+            r = requests.post(
+                f"{BROKER_URL}/latido",
+                json={"nombre": nombre_cola, "callback_url": CALLBACK_URL},
+                timeout=2
+            )
+            if r.status_code == 404:
+                print("El broker nos ha expulsado. Volviendo a suscribir.")
+                suscribirse_al_broker()
+        except requests.exceptions.RequestException as e:
+            print(f"No se pudo enviar el latido: {e}")
+
 if __name__ == '__main__':
 
     print("\nBienvenido al Consumidor.\n")
 
-    ip = input("Introduce la IP del broker: ").strip()
-    BROKER_URL = "http://" + ip + ":5000"
+    ip = input("Introduce la IP del broker (IP o IP:puerto): ").strip()
+    BROKER_URL = "http://" + (ip if ":" in ip else ip + ":5000")
 
     # Softcodeamos la IP local del broker.
     for iface_name, iface_addrs in psutil.net_if_addrs().items():
@@ -103,6 +128,6 @@ if __name__ == '__main__':
     suscribirse_al_broker()
     print("Consumidor iniciado. Presiona CTRL+C para parar.")
     try:
-        while True: time.sleep(10)
+        enviar_latidos()
     except KeyboardInterrupt:
         print("\nDetenido.")
\ No newline at end of file
@@ -45,22 +45,56 @@ def enviar_mensajes(nombre_cola, durable, numero):
             print("\nDetenido.")
             break
 
+def enviar_mensajes_binarios(nombre_cola, durable, numero):
+    """
+    Envía un número de mensajes binarios (application/octet-stream) a la cola.
+    El broker no los decodifica y los entrega tal cual al consumidor.
+    """
+    i = 0
+    while i < numero:
+        try:
+            mensaje = f"Mensaje binario duradero={durable} ({i})".encode()
+            r = requests.post(
+                f"{BROKER_URL}/publicar", 
+                data=mensaje,
+                headers={
+                    "Content-Type": "application/octet-stream",
+                    "X-Cola": nombre_cola,
+                    "X-Durable": str(durable).lower()
+                }
+            )
+            r.raise_for_status()
+            
+            print(f"Mensaje binario de {len(mensaje)} bytes enviado a la cola '{nombre_cola}'.")
+            
+            i += 1
+            time.sleep(2)
+            
+        except requests.exceptions.RequestException as e:
+            print(f"Error al publicar: {e}")
+            i += 1
+            time.sleep(5)
+        except KeyboardInterrupt:
+            print("\nDetenido.")
+            break
+
 if __name__ == '__main__':
     
     print("\nBienvenido al Productor.\n")
-    ip = input("Introduce la IP del broker: ").strip()
-    BROKER_URL = "http://" + ip + ":5000"
+    ip = input("Introduce la IP del broker (IP o IP:puerto): ").strip()
+    BROKER_URL = "http://" + (ip if ":" in ip else ip + ":5000")
 
     
     opcion = "0"
-    while opcion != "5":
+    while opcion != "6":
 
         print("Opciones:\n")
         print("     1. Declarar cola duradera.")
         print("     2. Declarar cola NO duradera.")
         print("     3. Iniciar envio de mensajes duraderos.")
         print("     4. Iniciar envio de mensajes NO duraderos.")
-        print("     5. Salir.\n")
+        print("     5. Iniciar envio de mensajes binarios duraderos.")
+        print("     6. Salir.\n")
 
         opcion = input("Seleccione una opcion: ").strip()
         
@@ -83,6 +117,11 @@ if __name__ == '__main__':
             enviar_mensajes(nombre_cola, durable=False, numero=num)
 
         elif opcion == '5':
+            nombre_cola = input("\nElige el nombre de la cola duradera para enviar mensajes binarios: ")
+            num = int(input("Numero de mensajes a enviar: "))
+            enviar_mensajes_binarios(nombre_cola, durable=True, numero=num)
+
+        elif opcion == '6':
             print("\nSaliendo...")
             break
 
@@ -0,0 +1,4 @@
+import os, sys
+
+# Los tests lanzan broker.py como proceso y reutilizan las utilidades de bench_cluster.py.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading, time, requests
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+from bench_cluster import puerto_libre, arrancar_cluster, arrancar_broker, parar, nodo_propietario
+
+
+PAYLOAD = b"\xff\xfe\x00\x80 no es utf-8 \xc3\x28"
+
+
+def arrancar_consumidor_binario(recibidos, url_broker, nombre_cola):
+    """
+    Consumidor de prueba que guarda (cuerpo, X-Message-Id) y confirma el mensaje.
+    """
+    app = Flask(__name__)
+
+    @app.route('/callback', methods=['POST'])
+    def callback():
+        message_id = request.headers.get("X-Message-Id")
+        recibidos.append((request.mimetype, request.get_data(), message_id))
+        threading.Thread(target=requests.post, args=(f"{url_broker}/ack",), kwargs={
+            "json": {"message_id": message_id, "nombre_cola": nombre_cola}
+        }).start()
+        return "ok", 200
+
+    puerto = puerto_libre()
+    servidor = make_server("127.0.0.1", puerto, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{puerto}/callback", servidor
+
+
+def test_binario_duradero_sobrevive_reinicio_y_llega_intacto(tmp_path):
+    urls, procesos = arrancar_cluster(2, str(tmp_path))
+    servidor = None
+    try:
+        propietario = nodo_propietario(urls, "bin")
+        ajeno = next(url for url in urls if url != propietario)
+
+        requests.post(f"{ajeno}/declarar_cola", json={"nombre": "bin", "durable": True})
+        r = requests.post(f"{ajeno}/publicar", data=PAYLOAD, headers={
+            "Content-Type": "application/octet-stream", "X-Cola": "bin", "X-Durable": "true"
+        })
+        assert r.status_code == 200
+
+        # Reiniciamos el propietario: el payload se recupera del base64 de broker.json.
+        indice = urls.index(propietario)
+        parar([procesos[indice]])
+        procesos[indice] = arrancar_broker(
+            int(propietario.rsplit(":", 1)[1]), str(tmp_path), "--nodos", ",".join(urls)
+        )
+
+        recibidos = []
+        callback_url, servidor = arrancar_consumidor_binario(recibidos, ajeno, "bin")
+        requests.post(f"{ajeno}/consumir", json={"nombre": "bin", "callback_url": callback_url})
+
+        limite = time.time() + 5
+        while not recibidos and time.time() < limite:
+            time.sleep(0.1)
+
+        assert len(recibidos) == 1
+        mimetype, cuerpo, message_id = recibidos[0]
+        assert mimetype == "application/octet-stream"
+        assert cuerpo == PAYLOAD
+        assert message_id
+    finally:
+        if servidor:
+            servidor.shutdown()
+        parar(procesos)
+
+
+def test_binario_vacio_es_valido(tmp_path):
+    puerto = puerto_libre()
+    proceso = arrancar_broker(puerto, str(tmp_path))
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        requests.post(f"{url}/declarar_cola", json={"nombre": "bin"})
+        r = requests.post(f"{url}/publicar", data=b"", headers={
+            "Content-Type": "application/octet-stream", "X-Cola": "bin"
+        })
+        assert r.status_code == 200
+        assert requests.get(f"{url}/colas/bin/stats").json()["profundidad"] == 1
+    finally:
+        parar([proceso])
\ No newline at end of file
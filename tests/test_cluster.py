@@ -0,0 +1,33 @@
+import requests
+
+from bench_cluster import arrancar_cluster, parar, nodo_propietario
+
+
+def test_publicar_reenviado_y_colas_agregadas(tmp_path):
+    urls, procesos = arrancar_cluster(3, str(tmp_path))
+    try:
+        colas = [f"cola-{i}" for i in range(12)]
+
+        for cola in colas:
+            r = requests.post(f"{urls[0]}/declarar_cola", json={"nombre": cola, "durable": True})
+            assert r.status_code == 200
+
+            # Publicamos a través de un nodo que no es el propietario.
+            propietario = nodo_propietario(urls, cola)
+            ajeno = next(url for url in urls if url != propietario)
+            r = requests.post(f"{ajeno}/publicar", json={"nombre": cola, "mensaje": cola, "durable": True})
+            assert r.status_code == 200
+
+        # Cada cola vive solo en su propietario, con su mensaje.
+        for url in urls:
+            locales = requests.get(f"{url}/colas", params={"local": 1}).json()["colas"]
+            assert sorted(locales) == sorted(c for c in colas if nodo_propietario(urls, c) == url)
+            for cola in locales:
+                data = requests.get(f"{url}/colas/{cola}/mensajes").json()
+                assert [m["payload"] for m in data["mensajes"]] == [cola]
+
+        # Cualquier nodo devuelve la lista completa, sin duplicados.
+        for url in urls:
+            assert sorted(requests.get(f"{url}/colas").json()["colas"]) == sorted(colas)
+    finally:
+        parar(procesos)
\ No newline at end of file
@@ -0,0 +1,62 @@
+import threading, time, requests
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+from bench_cluster import puerto_libre, arrancar_broker, parar
+
+
+def arrancar_consumidor(estado_http, recibidos, url_broker, nombre_cola):
+    """
+    Consumidor de prueba en un hilo. Responde con estado_http y, si es 200,
+    confirma el mensaje. Devuelve (callback_url, servidor).
+    """
+    app = Flask(__name__)
+
+    @app.route('/callback', methods=['POST'])
+    def callback():
+        if estado_http != 200:
+            return "fallo", estado_http
+        message_id = request.json["message_id"]
+        recibidos.append(message_id)
+        threading.Thread(target=requests.post, args=(f"{url_broker}/ack",), kwargs={
+            "json": {"message_id": message_id, "nombre_cola": nombre_cola}
+        }).start()
+        return "ok", 200
+
+    puerto = puerto_libre()
+    servidor = make_server("127.0.0.1", puerto, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{puerto}/callback", servidor
+
+
+def test_consumidor_con_errores_http_se_aparca(tmp_path):
+    puerto = puerto_libre()
+    proceso = arrancar_broker(puerto, str(tmp_path))
+    url = f"http://127.0.0.1:{puerto}"
+    servidores = []
+    try:
+        requests.post(f"{url}/declarar_cola", json={"nombre": "q"})
+        roto, servidor = arrancar_consumidor(500, [], url, "q")
+        servidores.append(servidor)
+        recibidos = []
+        sano, servidor = arrancar_consumidor(200, recibidos, url, "q")
+        servidores.append(servidor)
+        for callback_url in (roto, sano):
+            requests.post(f"{url}/consumir", json={"nombre": "q", "callback_url": callback_url})
+
+        for i in range(4):
+            requests.post(f"{url}/publicar", json={"nombre": "q", "mensaje": i})
+
+        # Los mensajes rechazados con 500 se re-encolan al momento, sin esperar a TIMEOUT_ACK.
+        limite = time.time() + 3
+        while len(set(recibidos)) < 4 and time.time() < limite:
+            time.sleep(0.1)
+        assert len(set(recibidos)) == 4
+
+        # Un latido no reactiva al consumidor hasta que pasa su tiempo de aparcamiento.
+        r = requests.post(f"{url}/latido", json={"nombre": "q", "callback_url": roto})
+        assert r.json()["aparcado"] is True
+    finally:
+        for servidor in servidores:
+            servidor.shutdown()
+        parar([proceso])
\ No newline at end of file
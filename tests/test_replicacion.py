@@ -0,0 +1,102 @@
+import json, os, time, requests
+
+from bench_cluster import puerto_libre, arrancar_broker, parar
+
+
+def arrancar_replicas(num_replicas, directorio, quorum):
+    """
+    Arranca un grupo de réplica en orden de prioridad (el primero será el líder).
+    """
+    puertos = [puerto_libre() for _ in range(num_replicas)]
+    replicas = ",".join(f"http://127.0.0.1:{p}" for p in puertos)
+    procesos = [
+        arrancar_broker(p, directorio, "--replicas", replicas, "--quorum", str(quorum))
+        for p in puertos
+    ]
+    return [f"http://127.0.0.1:{p}" for p in puertos], puertos, procesos
+
+
+def mensajes_guardados(directorio, puerto, cola):
+    with open(os.path.join(directorio, f"broker_{puerto}.json")) as f:
+        return [m["payload"] for m in json.load(f)[cola]["mensajes"]]
+
+def esperar_lider(url):
+    limite = time.time() + 20
+    while requests.get(f"{url}/replicacion/estado").json()["rol"] != "lider":
+        assert time.time() < limite, f"{url} no se promocionó"
+        time.sleep(0.5)
+
+
+def test_quorum_alcanzado_replica_en_seguidores(tmp_path):
+    urls, puertos, procesos = arrancar_replicas(3, str(tmp_path), quorum=2)
+    try:
+        assert requests.post(f"{urls[0]}/declarar_cola", json={"nombre": "q", "durable": True}).status_code == 200
+        # Un seguidor reenvía la publicación al líder.
+        r = requests.post(f"{urls[1]}/publicar", json={"nombre": "q", "mensaje": "hola", "durable": True})
+        assert r.status_code == 200
+
+        for puerto in puertos:
+            assert mensajes_guardados(str(tmp_path), puerto, "q") == ["hola"]
+    finally:
+        parar(procesos)
+
+
+def test_quorum_no_alcanzado_descarta_mensaje(tmp_path):
+    urls, puertos, procesos = arrancar_replicas(2, str(tmp_path), quorum=1)
+    try:
+        assert requests.post(f"{urls[0]}/declarar_cola", json={"nombre": "q", "durable": True}).status_code == 200
+        parar(procesos[1:])
+
+        r = requests.post(f"{urls[0]}/publicar", json={"nombre": "q", "mensaje": "hola", "durable": True})
+        assert r.status_code == 504
+
+        data = requests.get(f"{urls[0]}/colas/q/mensajes").json()
+        assert data["profundidad"] == 0
+        assert mensajes_guardados(str(tmp_path), puertos[0], "q") == []
+    finally:
+        parar(procesos[:1])
+
+
+def test_promocion_del_seguidor_tras_caida_del_lider(tmp_path):
+    urls, puertos, procesos = arrancar_replicas(2, str(tmp_path), quorum=1)
+    try:
+        requests.post(f"{urls[0]}/declarar_cola", json={"nombre": "q", "durable": True})
+        r = requests.post(f"{urls[0]}/publicar", json={"nombre": "q", "mensaje": "hola", "durable": True})
+        assert r.status_code == 200
+
+        parar(procesos[:1])
+        esperar_lider(urls[1])
+
+        data = requests.get(f"{urls[1]}/colas/q/mensajes").json()
+        assert [m["payload"] for m in data["mensajes"]] == ["hola"]
+    finally:
+        parar(procesos[1:])
+
+def test_lider_antiguo_reiniciado_no_pisa_mensajes_confirmados(tmp_path):
+    urls, puertos, procesos = arrancar_replicas(3, str(tmp_path), quorum=1)
+    try:
+        requests.post(f"{urls[0]}/declarar_cola", json={"nombre": "q", "durable": True})
+        r = requests.post(f"{urls[0]}/publicar", json={"nombre": "q", "mensaje": "m1", "durable": True})
+        assert r.status_code == 200
+
+        parar(procesos[:1])
+        esperar_lider(urls[1])
+        r = requests.post(f"{urls[1]}/publicar", json={"nombre": "q", "mensaje": "m2", "durable": True})
+        assert r.status_code == 200
+
+        # Cae el nuevo líder y vuelve el antiguo, el más prioritario pero con el
+        # log atrasado: no puede promocionarse, lidera la réplica que tiene m2.
+        parar(procesos[1:2])
+        procesos[0] = arrancar_broker(
+            puertos[0], str(tmp_path), "--replicas", ",".join(urls), "--quorum", "1"
+        )
+        esperar_lider(urls[2])
+        limite = time.time() + 15
+        while mensajes_guardados(str(tmp_path), puertos[0], "q") != ["m1", "m2"]:
+            assert time.time() < limite, "el antiguo líder no se puso al día"
+            time.sleep(0.5)
+
+        assert requests.get(f"{urls[0]}/replicacion/estado").json()["rol"] == "seguidor"
+        assert mensajes_guardados(str(tmp_path), puertos[2], "q") == ["m1", "m2"]
+    finally:
+        parar(procesos[:1] + procesos[2:])
\ No newline at end of file
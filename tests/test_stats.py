@@ -0,0 +1,38 @@
+import time, requests
+
+from bench_cluster import puerto_libre, arrancar_broker, parar
+from test_consumidores import arrancar_consumidor
+
+
+def test_stats_cuentan_bytes_del_payload_y_consumidores_aparcados(tmp_path):
+    puerto = puerto_libre()
+    proceso = arrancar_broker(puerto, str(tmp_path))
+    url = f"http://127.0.0.1:{puerto}"
+    servidor = None
+    try:
+        requests.post(f"{url}/declarar_cola", json={"nombre": "q"})
+        requests.post(f"{url}/publicar", json={"nombre": "q", "mensaje": "m1"})
+        requests.post(f"{url}/publicar", data=b"\x00\x01", headers={
+            "Content-Type": "application/octet-stream", "X-Cola": "q"
+        })
+
+        stats = requests.get(f"{url}/colas/q/stats").json()
+        assert stats["profundidad"] == 2
+        assert stats["bytes"] == len('"m1"') + 2
+
+        roto, servidor = arrancar_consumidor(500, [], url, "q")
+        requests.post(f"{url}/consumir", json={"nombre": "q", "callback_url": roto})
+
+        limite = time.time() + 3
+        while requests.get(f"{url}/colas/q/stats").json()["consumidores_aparcados"] == 0:
+            assert time.time() < limite, "el consumidor no se aparcó"
+            time.sleep(0.1)
+
+        stats = requests.get(f"{url}/colas/q/stats").json()
+        assert stats["consumidores"] == 0
+        assert stats["profundidad"] == 2
+        assert stats["bytes"] == len('"m1"') + 2
+    finally:
+        if servidor:
+            servidor.shutdown()
+        parar([proceso])
\ No newline at end of file